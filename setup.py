@@ -41,6 +41,12 @@ setup(
         "dev": [
             "pytest>=7.4.0",
             "pytest-cov>=4.1.0",
+            "pytest-xdist>=3.3.0",
+            "pytest-asyncio>=1.4.0",
+            "pytest-benchmark>=4.0.0",
+            "pyarrow>=14.0.0",
+            "numba>=0.56.0",
+            "uvloop>=0.19.0; sys_platform != 'win32'",
             "black>=23.7.0",
             "flake8>=6.0.0",
         ],
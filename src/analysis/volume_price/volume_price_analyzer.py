@@ -14,6 +14,10 @@ Author: AI Assistant
 Date: 2024
 """
 
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -46,12 +50,88 @@ class VolumePriceAnalyzer:
         self.volume_spike_threshold = config.get('volume_spike_threshold', 2.0)  # 放量阈值
         self.correlation_window = config.get('correlation_window', 20)  # 相关性计算窗口
         
+        # 分析结果缓存：按(股票代码, 数据指纹)缓存，相同输入直接返回，默认0表示不缓存
+        self.cache_size = config.get('cache_size', 0)
+        self._result_cache = OrderedDict()
+        self._cache_lock = threading.Lock()  # 多线程共享分析器时保护缓存的读取/淘汰
+        
+        # 中间结果缓存：单次分析内多处使用的滚动均值/标准差只算一次，按线程隔离，分析结束即释放
+        self._call_state = threading.local()
+        
         logger.info("量价分析器初始化完成")
     
+    @staticmethod
+    def _data_fingerprint(data: pd.DataFrame) -> str:
+        """
+        计算数据内容指纹（含列名和索引），内容相同的DataFrame指纹相同
+        
+        Args:
+            data: 股票数据
+            
+        Returns:
+            十六进制指纹字符串
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(list(data.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        return digest.hexdigest()
+    
+    def clear_cache(self):
+        """
+        清空分析结果缓存
+        """
+        with self._cache_lock:
+            self._result_cache.clear()
+        logger.info("量价分析结果缓存已清空")
+    
+    def _begin_intermediate_cache(self, data: pd.DataFrame):
+        """
+        为当前线程的本次分析开启中间结果缓存
+        
+        Args:
+            data: 本次分析使用的（已排序）股票数据
+        """
+        self._call_state.data = data
+        self._call_state.rolling_cache = {}
+    
+    def _end_intermediate_cache(self):
+        """
+        释放当前线程的中间结果缓存，不在分析之间保留数据引用
+        """
+        self._call_state.data = None
+        self._call_state.rolling_cache = None
+    
+    def _rolling_stat(self, data: pd.DataFrame, column: str, window: int, stat: str = 'mean') -> pd.Series:
+        """
+        计算列的滚动统计量，数据为本次分析的数据时复用缓存结果
+        
+        Args:
+            data: 股票数据
+            column: 列名
+            window: 滚动窗口
+            stat: 统计量名称（mean/std）
+            
+        Returns:
+            滚动统计序列（请勿原地修改）
+        """
+        if getattr(self._call_state, 'data', None) is not data:
+            return getattr(data[column].rolling(window), stat)()
+        
+        cache = self._call_state.rolling_cache
+        key = (column, stat, window)
+        result = cache.get(key)
+        if result is None:
+            result = getattr(data[column].rolling(window), stat)()
+            cache[key] = result
+        return result
+    
     def analyze_stock(self, symbol: str, data: pd.DataFrame) -> Dict[str, Any]:
         """
         对股票进行量价分析
         
+        相同股票代码和数据内容的重复分析复用缓存结果：每次返回刷新了analysis_date的浅拷贝，
+        顶层键可以替换，但其中的指标字典和序列与缓存共享，请勿原地修改。
+        
         Args:
             symbol: 股票代码
             data: 股票数据DataFrame，需包含OHLCV数据
@@ -71,8 +151,28 @@ class VolumePriceAnalyzer:
             if missing_columns:
                 raise ValueError(f"缺少必要的数据列: {missing_columns}")
             
+            # 命中缓存则直接返回
+            cache_key = None
+            if self.cache_size > 0:
+                try:
+                    cache_key = (symbol, self._data_fingerprint(data))
+                except TypeError:
+                    # 含不可哈希的单元格时不缓存
+                    cache_key = None
+            if cache_key is not None:
+                with self._cache_lock:
+                    cached_result = self._result_cache.get(cache_key)
+                    if cached_result is not None:
+                        self._result_cache.move_to_end(cache_key)
+                if cached_result is not None:
+                    logger.info(f"{symbol} 量价分析命中缓存")
+                    result = dict(cached_result)
+                    result['analysis_date'] = datetime.now()
+                    return result
+            
             # 确保数据按日期排序
             data = data.sort_index()
+            self._begin_intermediate_cache(data)
             
             # 分析结果容器
             analysis_result = {
@@ -121,12 +221,23 @@ class VolumePriceAnalyzer:
             trading_signals = self._generate_trading_signals(data, analysis_result)
             analysis_result['trading_signals'] = trading_signals
             
+            if cache_key is not None:
+                with self._cache_lock:
+                    self._result_cache[cache_key] = analysis_result
+                    self._result_cache.move_to_end(cache_key)
+                    while len(self._result_cache) > self.cache_size:
+                        self._result_cache.popitem(last=False)
+                # 返回副本，调用方替换顶层键不影响缓存
+                analysis_result = dict(analysis_result)
+            
             logger.info(f"{symbol} 量价分析完成")
             return analysis_result
             
         except Exception as e:
             logger.error(f"量价分析失败: {str(e)}")
             raise
+        finally:
+            self._end_intermediate_cache()
     
     def _calculate_basic_indicators(self, data: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -149,15 +260,15 @@ class VolumePriceAnalyzer:
             indicators['volume_change'] = data['Volume'].pct_change(fill_method=None)
             indicators['volume_ma'] = {}
             for period in self.volume_ma_periods:
-                indicators['volume_ma'][f'ma_{period}'] = data['Volume'].rolling(period).mean()
+                indicators['volume_ma'][f'ma_{period}'] = self._rolling_stat(data, 'Volume', period)
             
             # 价格均线
             indicators['price_ma'] = {}
             for period in self.price_ma_periods:
-                indicators['price_ma'][f'ma_{period}'] = data['Close'].rolling(period).mean()
+                indicators['price_ma'][f'ma_{period}'] = self._rolling_stat(data, 'Close', period)
             
             # 相对成交量（当日成交量/平均成交量）
-            indicators['relative_volume'] = data['Volume'] / data['Volume'].rolling(20).mean()
+            indicators['relative_volume'] = data['Volume'] / self._rolling_stat(data, 'Volume', 20)
             
             # 成交量比率（Volume Ratio）
             indicators['volume_ratio'] = data['Volume'] / data['Volume'].shift(1)
@@ -173,7 +284,7 @@ class VolumePriceAnalyzer:
             current_data = {
                 'current_price': data['Close'].iloc[-1],
                 'current_volume': data['Volume'].iloc[-1],
-                'avg_volume_20': data['Volume'].rolling(20).mean().iloc[-1],
+                'avg_volume_20': self._rolling_stat(data, 'Volume', 20).iloc[-1],
                 'relative_volume_current': indicators['relative_volume'].iloc[-1],
                 'price_change_current': indicators['price_change'].iloc[-1]
             }
@@ -337,8 +448,8 @@ class VolumePriceAnalyzer:
         """
         try:
             # 计算价格和成交量的标准化值
-            price_normalized = (data['Close'] - data['Close'].rolling(20).mean()) / data['Close'].rolling(20).std()
-            volume_normalized = (data['Volume'] - data['Volume'].rolling(20).mean()) / data['Volume'].rolling(20).std()
+            price_normalized = (data['Close'] - self._rolling_stat(data, 'Close', 20)) / self._rolling_stat(data, 'Close', 20, 'std')
+            volume_normalized = (data['Volume'] - self._rolling_stat(data, 'Volume', 20)) / self._rolling_stat(data, 'Volume', 20, 'std')
             
             # 配合度评分
             coordination_score = self._calculate_coordination_score(price_normalized, volume_normalized)
@@ -380,8 +491,8 @@ class VolumePriceAnalyzer:
         """
         try:
             # 计算成交量的统计特征
-            volume_mean = data['Volume'].rolling(60).mean()
-            volume_std = data['Volume'].rolling(60).std()
+            volume_mean = self._rolling_stat(data, 'Volume', 60)
+            volume_std = self._rolling_stat(data, 'Volume', 60, 'std')
             
             # 识别异常放量
             volume_spikes = data['Volume'] > (volume_mean + self.volume_spike_threshold * volume_std)
@@ -647,7 +758,7 @@ class VolumePriceAnalyzer:
         price_strength = (price_change + price_amplitude) / 2
         
         # 计算成交量强度（基于相对成交量）
-        volume_ma = data['Volume'].rolling(20).mean()
+        volume_ma = self._rolling_stat(data, 'Volume', 20)
         volume_strength = data['Volume'] / volume_ma
         
         # 综合强度
@@ -863,8 +974,8 @@ class VolumePriceAnalyzer:
             放量突破模式列表
         """
         patterns = []
-        volume_ma = data['Volume'].rolling(20).mean()
-        price_ma = data['Close'].rolling(20).mean()
+        volume_ma = self._rolling_stat(data, 'Volume', 20)
+        price_ma = self._rolling_stat(data, 'Close', 20)
         
         for i in range(20, len(data)):
             # 成交量突破（超过平均成交量的2倍）
@@ -893,7 +1004,7 @@ class VolumePriceAnalyzer:
             缩量整理模式列表
         """
         patterns = []
-        volume_ma = data['Volume'].rolling(20).mean()
+        volume_ma = self._rolling_stat(data, 'Volume', 20)
         
         # 寻找连续缩量的区间
         low_volume_periods = data['Volume'] < volume_ma * 0.7  # 成交量低于平均值70%
@@ -933,8 +1044,8 @@ class VolumePriceAnalyzer:
             异常放量模式列表
         """
         patterns = []
-        volume_ma = data['Volume'].rolling(60).mean()
-        volume_std = data['Volume'].rolling(60).std()
+        volume_ma = self._rolling_stat(data, 'Volume', 60)
+        volume_std = self._rolling_stat(data, 'Volume', 60, 'std')
         
         # 异常放量阈值（平均值 + 3倍标准差）
         spike_threshold = volume_ma + 3 * volume_std
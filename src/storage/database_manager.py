@@ -11,6 +11,7 @@ Date: 2024
 """
 
 import sqlite3
+import threading
 import pandas as pd
 from pathlib import Path
 from typing import Optional, Dict, Any, List
@@ -19,6 +20,7 @@ from loguru import logger
 
 try:
     from sqlalchemy import create_engine, text, MetaData, Table, Column, String, Float, DateTime, Integer, Index
+    from sqlalchemy import insert, select, delete, bindparam
     from sqlalchemy.orm import sessionmaker
     from sqlalchemy.ext.declarative import declarative_base
 except ImportError:
@@ -28,6 +30,10 @@ except ImportError:
 
 Base = declarative_base()
 
+# 未指定查询日期范围时使用的边界（兼容SQLite与MySQL的DATETIME取值范围）
+MIN_QUERY_DATE = datetime(1900, 1, 1)
+MAX_QUERY_DATE = datetime(9999, 12, 31)
+
 
 class StockData(Base):
     """
@@ -45,8 +51,7 @@ class StockData(Base):
     volume = Column(Float, nullable=False)
     change_pct = Column(Float)
     change_amount = Column(Float)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=datetime.now)  # 本地时间，与AnalysisResult一致；K线数据写入后不再更新
     
     # 创建复合索引
     __table_args__ = (
@@ -91,9 +96,15 @@ class DatabaseManager:
         self.engine = None
         self.Session = None
         
+        # 写入锁：多线程并发保存时串行化写操作（SQLite同一时间只允许一个写入者）
+        self._write_lock = threading.Lock()
+        
         # 初始化数据库连接
         self._init_database()
         
+        # 预构建热点SQL语句
+        self._init_statements()
+        
         logger.info("数据库管理器初始化完成")
     
     def _init_database(self) -> None:
@@ -145,11 +156,11 @@ class DatabaseManager:
         # 确保数据库目录存在
         db_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # 创建SQLite引擎
+        # 创建SQLite引擎（本地文件不存在断线问题，关闭pre_ping省去每次检出的SELECT 1）
         self.engine = create_engine(
             f'sqlite:///{db_path}',
             echo=False,
-            pool_pre_ping=True
+            pool_pre_ping=False
         )
         
         logger.info(f"SQLite数据库初始化成功: {db_path}")
@@ -175,11 +186,27 @@ class DatabaseManager:
             connection_string,
             echo=False,
             pool_pre_ping=True,
-            pool_recycle=3600
+            pool_recycle=1800
         )
         
         logger.info(f"MySQL数据库初始化成功: {host}:{port}/{database}")
     
+    def _init_statements(self) -> None:
+        """
+        预构建股票数据读写的热点SQL语句
+        
+        语句只构建一次，执行时通过绑定参数传值，配合引擎默认的编译缓存跳过重复的SQL生成
+        """
+        symbol_in_range = (
+            (StockData.symbol == bindparam('s')) &
+            StockData.date.between(bindparam('lo'), bindparam('hi'))
+        )
+        
+        self._insert_stmt = insert(StockData)
+        self._select_stmt = select(StockData).where(symbol_in_range).order_by(StockData.date)
+        # 不同步会话，避免ORM为回填会话而附加RETURNING/预先SELECT被删行
+        self._range_delete = delete(StockData).where(symbol_in_range).execution_options(synchronize_session=False)
+    
     def _create_tables(self) -> None:
         """
         创建数据库表
@@ -205,33 +232,45 @@ class DatabaseManager:
         try:
             session = self.Session()
             
-            # 删除已存在的数据（避免重复）
-            date_range = (data.index.min(), data.index.max())
-            session.query(StockData).filter(
-                StockData.symbol == symbol,
-                StockData.date >= date_range[0],
-                StockData.date <= date_range[1]
-            ).delete()
-            
-            # 准备新数据
-            records = []
-            for date, row in data.iterrows():
-                record = StockData(
-                    symbol=symbol,
-                    date=date,
-                    open_price=float(row['Open']),
-                    high_price=float(row['High']),
-                    low_price=float(row['Low']),
-                    close_price=float(row['Close']),
-                    volume=float(row['Volume']),
-                    change_pct=float(row.get('Change', 0)) if pd.notna(row.get('Change', 0)) else None,
-                    change_amount=float(row.get('Change_Amount', 0)) if pd.notna(row.get('Change_Amount', 0)) else None
+            # 准备新数据：按列整体取值，避免逐行iterrows构造Series；写入时间整批取一次
+            created_at = datetime.now()
+            records = [
+                {
+                    'symbol': symbol,
+                    'date': date,
+                    'open_price': open_price,
+                    'high_price': high_price,
+                    'low_price': low_price,
+                    'close_price': close_price,
+                    'volume': volume,
+                    'change_pct': change_pct,
+                    'change_amount': change_amount,
+                    'created_at': created_at
+                }
+                for date, open_price, high_price, low_price, close_price, volume,
+                    change_pct, change_amount in zip(
+                    data.index,
+                    data['Open'].astype(float).tolist(),
+                    data['High'].astype(float).tolist(),
+                    data['Low'].astype(float).tolist(),
+                    data['Close'].astype(float).tolist(),
+                    data['Volume'].astype(float).tolist(),
+                    self._optional_column(data, 'Change'),
+                    self._optional_column(data, 'Change_Amount')
                 )
-                records.append(record)
-            
-            # 批量插入
-            session.add_all(records)
-            session.commit()
+            ]
+            
+            with self._write_lock:
+                # 删除已存在的数据（避免重复）
+                session.execute(self._range_delete, {
+                    's': symbol,
+                    'lo': data.index.min(),
+                    'hi': data.index.max()
+                })
+                
+                # 批量插入
+                session.execute(self._insert_stmt, records)
+                session.commit()
             
             logger.info(f"成功保存 {symbol} 的 {len(records)} 条数据")
             return True
@@ -243,6 +282,23 @@ class DatabaseManager:
         finally:
             session.close()
     
+    @staticmethod
+    def _optional_column(data: pd.DataFrame, column: str) -> List[Optional[float]]:
+        """
+        取可选数值列，缺失列按0处理，空值转为None
+        
+        Args:
+            data: 股票数据DataFrame
+            column: 列名
+            
+        Returns:
+            与数据行对应的数值列表
+        """
+        if column not in data.columns:
+            return [0.0] * len(data)
+        values = data[column].astype(float)
+        return [None if pd.isna(value) else value for value in values.tolist()]
+    
     def get_stock_data(self, symbol: str, start_date: Optional[datetime] = None, 
                       end_date: Optional[datetime] = None) -> Optional[pd.DataFrame]:
         """
@@ -259,20 +315,12 @@ class DatabaseManager:
         try:
             session = self.Session()
             
-            # 构建查询
-            query = session.query(StockData).filter(StockData.symbol == symbol)
-            
-            if start_date:
-                query = query.filter(StockData.date >= start_date)
-            
-            if end_date:
-                query = query.filter(StockData.date <= end_date)
-            
-            # 按日期排序
-            query = query.order_by(StockData.date)
-            
-            # 执行查询
-            results = query.all()
+            # 执行预构建的查询（已按日期排序）
+            results = session.execute(self._select_stmt, {
+                's': symbol,
+                'lo': start_date or MIN_QUERY_DATE,
+                'hi': end_date or MAX_QUERY_DATE
+            }).scalars().all()
             
             if not results:
                 logger.warning(f"未找到股票 {symbol} 的数据")
@@ -393,6 +441,46 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def get_analysis_results(self, symbols: List[str],
+                           analysis_type: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+        """
+        批量获取多只股票的最新分析结果（单次IN查询）
+        
+        Args:
+            symbols: 股票代码列表
+            analysis_type: 分析类型（可选，默认获取全部类型）
+            
+        Returns:
+            {股票代码: {分析类型: 分析结果JSON字符串}}，无结果的股票不出现在字典中
+        """
+        if not symbols:
+            return {}
+        
+        try:
+            session = self.Session()
+            
+            query = session.query(
+                AnalysisResult.symbol,
+                AnalysisResult.analysis_type,
+                AnalysisResult.result_data
+            ).filter(AnalysisResult.symbol.in_(symbols))
+            
+            if analysis_type:
+                query = query.filter(AnalysisResult.analysis_type == analysis_type)
+            
+            # 按日期升序遍历，同一股票同一类型保留最新的结果
+            results = {}
+            for symbol, result_type, result_data in query.order_by(AnalysisResult.analysis_date):
+                results.setdefault(symbol, {})[result_type] = result_data
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"批量获取分析结果失败: {str(e)}")
+            return {}
+        finally:
+            session.close()
+    
     def get_available_symbols(self) -> List[str]:
         """
         获取数据库中所有可用的股票代码
@@ -12,6 +12,7 @@ Date: 2024
 import sys
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 添加src目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent / "src"))
@@ -50,44 +51,51 @@ def test_akshare_data_source():
             "600036.SH",   # 招商银行（完整格式）
         ]
         
-        for stock_code in test_stocks:
-            print(f"\n📊 测试股票: {stock_code}")
-            print("-" * 30)
+        # 数据获取为I/O密集型，并发获取各股票数据
+        print(f"\n📥 正在并发获取 {len(test_stocks)} 只股票的数据...")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {
+                executor.submit(system.fetch_and_store_data, stock_code, "3mo"): stock_code
+                for stock_code in test_stocks
+            }
             
-            try:
-                # 获取数据
-                print(f"📥 正在获取 {stock_code} 的数据...")
-                success = system.fetch_and_store_data(stock_code, "3mo")
+            for future in as_completed(futures):
+                stock_code = futures[future]
+                print(f"\n📊 测试股票: {stock_code}")
+                print("-" * 30)
                 
-                if success:
-                    print(f"✅ {stock_code} 数据获取成功")
+                try:
+                    success = future.result()
                     
-                    # 执行分析
-                    print(f"🔍 正在分析 {stock_code}...")
-                    results = system.analyze_stock(stock_code, "all")
-                    
-                    if results:
-                        print(f"✅ {stock_code} 分析完成")
+                    if success:
+                        print(f"✅ {stock_code} 数据获取成功")
                         
-                        # 显示分析结果摘要
-                        if 'gann' in results:
-                            gann_data = results['gann']
-                            print(f"   🔮 江恩分析: 包含 {len(gann_data.get('time_cycles', []))} 个时间周期")
+                        # 执行分析
+                        print(f"🔍 正在分析 {stock_code}...")
+                        results = system.analyze_stock(stock_code, "all")
                         
-                        if 'volume_price' in results:
-                            vp_data = results['volume_price']
-                            if 'volume_price_relation' in vp_data:
-                                relation = vp_data['volume_price_relation']
-                                trend = relation.get('trend', 'N/A')
-                                print(f"   📈 量价关系: {trend}")
+                        if results:
+                            print(f"✅ {stock_code} 分析完成")
+                            
+                            # 显示分析结果摘要
+                            if 'gann' in results:
+                                gann_data = results['gann']
+                                print(f"   🔮 江恩分析: 包含 {len(gann_data.get('time_cycles', []))} 个时间周期")
+                            
+                            if 'volume_price' in results:
+                                vp_data = results['volume_price']
+                                if 'volume_price_relation' in vp_data:
+                                    relation = vp_data['volume_price_relation']
+                                    trend = relation.get('trend', 'N/A')
+                                    print(f"   📈 量价关系: {trend}")
+                        else:
+                            print(f"❌ {stock_code} 分析失败")
                     else:
-                        print(f"❌ {stock_code} 分析失败")
-                else:
-                    print(f"❌ {stock_code} 数据获取失败")
-                    
-            except Exception as e:
-                print(f"❌ 处理 {stock_code} 时发生错误: {str(e)}")
-                logger.error(f"处理股票 {stock_code} 时发生错误: {str(e)}")
+                        print(f"❌ {stock_code} 数据获取失败")
+                        
+                except Exception as e:
+                    print(f"❌ 处理 {stock_code} 时发生错误: {str(e)}")
+                    logger.error(f"处理股票 {stock_code} 时发生错误: {str(e)}")
         
         print("\n🎉 akshare数据源测试完成")
         
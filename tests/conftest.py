@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+
+注册自定义标记、提供公共fixture、配置异步测试事件循环，供各测试模块共享。
+"""
+
+import os
+import time
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+
+def pytest_addoption(parser):
+    """注册自定义命令行选项"""
+    parser.addoption(
+        "--run-slow", action="store_true", default=False,
+        help="运行标记为slow的耗时测试（默认跳过）"
+    )
+
+
+def pytest_configure(config):
+    """注册自定义pytest标记；xdist并行时关闭基准计时"""
+    config.addinivalue_line("markers", "slow: 耗时较长的性能/大数据测试，默认跳过，需 --run-slow 运行")
+    
+    # pytest-benchmark在xdist下无法计时，会自行停用并逐次告警；此处提前停用（用例仍执行一次），
+    # 需要记录耗时时串行运行：python -m pytest tests/ -n 0 --benchmark-only
+    xdist_active = config.getoption("dist", "no") != "no" or "PYTEST_XDIST_WORKER" in os.environ
+    if (pytest_benchmark is not None and xdist_active
+            and not config.getoption("benchmark_only") and not config.getoption("benchmark_enable")):
+        config.option.benchmark_disable = True
+
+
+def pytest_collection_modifyitems(config, items):
+    """未指定 --run-slow 时跳过slow标记的测试"""
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="耗时测试，使用 --run-slow 运行")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+# 2019-2023五年日期索引，各行情fixture按需切片，避免重复构建
+_MASTER_DATES = pd.date_range(start='2019-01-01', end='2023-12-31', freq='D')
+
+# OHLCV列统一使用float32：测试只验证分析流程而非数值精度，内存占用减半
+_OHLCV_FLOAT32 = dict.fromkeys(['Open', 'High', 'Low', 'Close', 'Volume'], 'float32')
+
+# 量价分析测试配置（单元测试与集成测试共用）
+_VP_CONFIG = {
+    'volume_ma_periods': [5, 10, 20, 60],
+    'price_ma_periods': [5, 10, 20, 60],
+    'divergence_threshold': 0.15,
+    'volume_spike_threshold': 2.0,
+    'correlation_window': 20,
+    'cache_size': 32  # 生产默认不缓存，测试中共享的分析器开启结果缓存
+}
+
+
+@pytest.fixture(scope="session")
+def vp_analyzer():
+    """量价分析器（整个会话共享，带分析结果缓存；用例请勿清空缓存或修改其状态）"""
+    from src.analysis.volume_price.volume_price_analyzer import VolumePriceAnalyzer
+    return VolumePriceAnalyzer(_VP_CONFIG)
+
+
+@pytest.fixture(scope="session")
+def base_ohlcv():
+    """一年的模拟OHLCV数据（只读，需修改时请先copy）"""
+    dates = _MASTER_DATES[-365:]  # 2023全年
+    # 固定种子确保可重复；价格/成交量/最高/最低四路正态噪声一次生成
+    rng = np.random.default_rng(42)
+    randbuf = rng.standard_normal(size=(len(dates), 4))
+    
+    # 生成模拟股价数据
+    base_price = 10.0
+    price_changes = randbuf[:, 0] * 0.02
+    growth = 1 + price_changes
+    growth[0] = 1.0  # 首日保持基准价
+    prices = np.maximum(base_price * np.cumprod(growth), 0.1)  # 确保价格为正
+    
+    # 生成成交量数据（与价格有一定相关性）
+    base_volume = 1000000
+    volume_changes = randbuf[:, 1] * 0.3
+    
+    # 价格变化大时，成交量通常也会增加
+    volume_factor = 1 + np.abs(price_changes) * 2 + volume_changes
+    volumes = base_volume * np.maximum(volume_factor, 0.1)
+    
+    # 最高/最低价扰动
+    hi_jitter = np.abs(randbuf[:, 2]) * 0.01
+    lo_jitter = np.abs(randbuf[:, 3]) * 0.01
+    
+    data = pd.DataFrame({
+        'Date': dates,
+        'Open': prices,
+        'High': prices * (1 + hi_jitter),
+        'Low': prices * (1 - lo_jitter),
+        'Close': prices,
+        'Volume': volumes
+    }).set_index('Date')  # 日期作为DatetimeIndex，与数据库读出的数据格式一致
+    
+    # 确保high >= close >= low
+    data['High'] = np.maximum(data['High'].values, data['Close'].values)
+    data['Low'] = np.minimum(data['Low'].values, data['Close'].values)
+    return data.astype(_OHLCV_FLOAT32)
+
+
+@pytest.fixture(scope="session")
+def large_ohlcv():
+    """2019-2023五年的模拟OHLCV数据，用于大数据集性能测试（只读，需修改时请先copy）"""
+    dates = _MASTER_DATES
+    # 价格/成交量两路正态噪声一次生成
+    rng = np.random.default_rng(42)
+    randbuf = rng.standard_normal(size=(len(dates), 2))
+    
+    price_changes = randbuf[:, 0] * 0.01
+    volume_changes = randbuf[:, 1] * 0.2
+    price_changes[0] = volume_changes[0] = 0.0  # 首日保持初始价格和成交量
+    
+    prices = np.maximum(10.0 * np.cumprod(1 + price_changes), 0.1)
+    volumes = np.maximum(1000000 * np.cumprod(1 + volume_changes + np.abs(price_changes)), 1000)
+    
+    data = pd.DataFrame({
+        'Open': prices,
+        'High': prices * 1.02,
+        'Low': prices * 0.98,
+        'Close': prices,
+        'Volume': volumes
+    }, index=dates.rename('Date'))
+    return data.astype(_OHLCV_FLOAT32)
+
+@pytest.fixture(scope="session")
+def realistic_ohlcv():
+    """上升、盘整、下降三个阶段的模拟OHLCV数据（只读，需修改时请先copy）"""
+    dates = _MASTER_DATES[-365:]  # 2023全年
+    # 价格/成交量/最高/最低四路正态噪声一次生成，各阶段按位置切片
+    rng = np.random.default_rng(42)
+    randbuf = rng.standard_normal(size=(len(dates), 4))
+    
+    # 模拟不同的市场阶段
+    base_price = 10.0
+    base_volume = 1000000
+    
+    # 创建三个阶段：上升、盘整、下降
+    stage1_len = len(dates) // 3  # 上升阶段
+    stage2_len = len(dates) // 3  # 盘整阶段
+    s1, s2 = slice(0, stage1_len), slice(stage1_len, stage1_len + stage2_len)
+    s3 = slice(stage1_len + stage2_len, None)  # 下降阶段（含余数）
+    
+    # 各阶段涨跌幅拼接后一次cumprod：上升阶段价涨量增、盘整阶段价平量缩、下降阶段价跌量增（恐慌性抛售）
+    price_changes = np.concatenate([
+        0.001 + randbuf[s1, 0] * 0.015,  # 轻微上升趋势
+        randbuf[s2, 0] * 0.01,  # 无明显趋势
+        -0.002 + randbuf[s3, 0] * 0.02,  # 下降趋势
+    ])
+    volume_changes = np.concatenate([
+        0.002 + randbuf[s1, 1] * 0.2,  # 成交量增加
+        -0.001 + randbuf[s2, 1] * 0.15,  # 成交量减少
+        0.003 + randbuf[s3, 1] * 0.25,  # 成交量放大
+    ])
+    price_changes[0] = volume_changes[0] = 0.0  # 首日保持基准值
+    prices = np.maximum(base_price * np.cumprod(1 + price_changes), 0.1)
+    volumes = np.maximum(base_volume * np.cumprod(1 + volume_changes), 1000)
+    
+    # 最高/最低价扰动
+    hi_jitter = np.abs(randbuf[:, 2]) * 0.008
+    lo_jitter = np.abs(randbuf[:, 3]) * 0.008
+    
+    df = pd.DataFrame({
+        'Date': dates,
+        'Open': prices,
+        'High': prices * (1 + hi_jitter),
+        'Low': prices * (1 - lo_jitter),
+        'Close': prices,
+        'Volume': volumes
+    }).set_index('Date')  # 日期作为DatetimeIndex，与数据库读出的数据格式一致
+    
+    # 确保OHLC数据的逻辑关系（整列一次性计算）
+    df['High'] = np.maximum.reduce([df['High'].values, df['Open'].values, df['Close'].values])
+    df['Low'] = np.minimum.reduce([df['Low'].values, df['Open'].values, df['Close'].values])
+    return df.astype(_OHLCV_FLOAT32)
+
+
+@pytest.fixture
+def async_mock_factory():
+    """创建AsyncMock的工厂，按关键字参数设置return_value/side_effect等属性"""
+    def _factory(**attrs):
+        mock = AsyncMock()
+        for name, value in attrs.items():
+            setattr(mock, name, value)
+        return mock
+    return _factory
+
+
+if pytest_benchmark is None:
+    @pytest.fixture
+    def benchmark(record_property):
+        """未安装pytest-benchmark时的替代fixture：执行一次并记录perf_counter_ns耗时"""
+        def _run(func, *args, **kwargs):
+            start = time.perf_counter_ns()
+            result = func(*args, **kwargs)
+            record_property("elapsed_ns", time.perf_counter_ns() - start)
+            return result
+        
+        def _pedantic(target, args=(), kwargs=None, setup=None, **_):
+            """兼容benchmark.pedantic：先执行setup，再计时执行一次"""
+            if setup is not None:
+                setup()
+            return _run(target, *args, **(kwargs or {}))
+        
+        _run.pedantic = _pedantic
+        return _run
+
+
+if uvloop is not None:
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_asyncio_loop_factories(config, item):
+        """使用uvloop创建异步测试的事件循环（未安装uvloop时使用asyncio默认循环）"""
+        return {"uvloop": uvloop.new_event_loop}
@@ -10,73 +10,142 @@
 日期: 2024-01-15
 """
 
+import time
 import unittest
+import pytest
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import sys
-import os
+from pathlib import Path
 
-# 添加项目根目录到路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 添加项目根目录到路径（直接运行本文件时使用，pytest下由pytest.ini的pythonpath完成）
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
 
 from src.analysis.gann.gann_wheel import GannWheel
 
+# 江恩分析默认测试配置（只读，各测试类共享）
+_DEFAULT_CONFIG = {
+    'time_cycles': [7, 14, 21, 30, 45, 60, 90, 120, 180, 360],
+    'price_angles': [15, 30, 45, 60, 75, 90, 105, 120, 135, 150, 165, 180],
+    'square_size': 144,
+    'tolerance': 0.02
+}
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _gbm_path(base, changes, floor):
+        """按日收益率序列逐日递推价格路径，价格不低于floor"""
+        n = changes.shape[0]
+        out = np.empty(n)
+        p = base
+        for i in range(n):
+            p = p * (1.0 + changes[i])
+            if p < floor:
+                p = floor
+            out[i] = p
+        return out
+else:
+    def _gbm_path(base, changes, floor):
+        """按日收益率序列逐日递推价格路径（未安装numba时的纯Python实现，结果与numba版逐位一致）"""
+        out = np.empty(len(changes))
+        p = base
+        for i, change in enumerate(changes.tolist()):
+            p = max(p * (1.0 + change), floor)
+            out[i] = p
+        return out
+
 
 class TestGannWheel(unittest.TestCase):
     """江恩轮中轮分析器测试类"""
     
-    def setUp(self):
-        """测试前准备工作"""
+    # 5年大数据集，首次使用时构建并在类级缓存
+    _large_data = None
+    
+    # test_data的分析结果，多个只读用例共享
+    _analysis = None
+    
+    @classmethod
+    def setUpClass(cls):
+        """测试类准备工作（测试数据只读，整个类共享一份）"""
         # 创建测试配置
-        self.test_config = {
-            'time_cycles': [7, 14, 21, 30, 45, 60, 90, 120, 180, 360],
-            'price_angles': [15, 30, 45, 60, 75, 90, 105, 120, 135, 150, 165, 180],
-            'square_size': 144,
-            'tolerance': 0.02
-        }
+        cls.test_config = _DEFAULT_CONFIG
         
-        self.gann = GannWheel(self.test_config)
+        cls.gann = GannWheel(cls.test_config)
         
         # 创建测试数据
         dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='D')
-        np.random.seed(42)  # 确保测试结果可重复
+        cls.rng = np.random.default_rng(42)  # 确保测试结果可重复
         
-        # 生成模拟股价数据
+        # 生成模拟股价数据（首日保持基准价，同时预热JIT）
         base_price = 10.0
-        price_changes = np.random.normal(0, 0.02, len(dates))
-        prices = [base_price]
-        
-        for change in price_changes[1:]:
-            new_price = prices[-1] * (1 + change)
-            prices.append(max(new_price, 0.1))  # 确保价格为正
+        price_changes = cls.rng.normal(0, 0.02, len(dates))
+        price_changes[0] = 0.0
+        prices_arr = _gbm_path(base_price, price_changes, 0.1)  # 确保价格为正
         
         # 生成成交量数据
-        volumes = np.random.lognormal(10, 0.5, len(dates))
+        volumes = cls.rng.lognormal(10, 0.5, len(dates))
         
-        self.test_data = pd.DataFrame({
-            'date': dates,
-            'open': prices,
-            'high': [p * (1 + abs(np.random.normal(0, 0.01))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.01))) for p in prices],
-            'close': prices,
-            'volume': volumes
-        })
+        # 一次性生成最高/最低价扰动
+        noise_h = np.abs(cls.rng.normal(0, 0.01, len(dates)))
+        noise_l = np.abs(cls.rng.normal(0, 0.01, len(dates)))
+        high_arr = prices_arr * (1 + noise_h)
+        low_arr = prices_arr * (1 - noise_l)
         
         # 确保high >= close >= low
-        self.test_data['high'] = self.test_data[['high', 'close']].max(axis=1)
-        self.test_data['low'] = self.test_data[['low', 'close']].min(axis=1)
+        high_arr = np.maximum(high_arr, prices_arr)
+        low_arr = np.minimum(low_arr, prices_arr)
+        
+        # 各列均为ndarray，直接交给pandas，避免逐元素类型推断
+        cls.test_data = pd.DataFrame({
+            'date': dates,
+            'open': prices_arr,
+            'high': high_arr,
+            'low': low_arr,
+            'close': prices_arr,
+            'volume': volumes
+        }, copy=False)
+        
+    @classmethod
+    def _get_large_data(cls):
+        """获取5年大数据集（懒加载，类级缓存）"""
+        if cls._large_data is None:
+            large_dates = pd.date_range(start='2019-01-01', end='2023-12-31', freq='D')
+            rng = np.random.default_rng(42)  # 独立随机源，与用例执行顺序无关
+            
+            changes = rng.normal(0, 0.01, len(large_dates))
+            changes[0] = 0
+            large_prices = _gbm_path(10.0, changes, 0.1)
+                
+            cls._large_data = pd.DataFrame({
+                'date': large_dates,
+                'open': large_prices,
+                'high': large_prices * 1.02,
+                'low': large_prices * 0.98,
+                'close': large_prices,
+                'volume': rng.lognormal(10, 0.5, len(large_dates))
+            })
+        return cls._large_data
+        
+    @classmethod
+    def _get_analysis(cls):
+        """获取test_data的分析结果（首次调用时分析，类级缓存）"""
+        if cls._analysis is None:
+            cls._analysis = cls.gann.analyze(cls.test_data)
+        return cls._analysis
         
     def test_initialization(self):
         """测试江恩分析器初始化"""
         # 测试默认初始化
-        default_config = {
-            'time_cycles': [7, 14, 21, 30, 45, 60, 90, 120, 180, 360],
-            'price_angles': [15, 30, 45, 60, 75, 90, 105, 120, 135, 150, 165, 180],
-            'square_size': 144,
-            'tolerance': 0.02
-        }
-        gann = GannWheel(default_config)
+        gann = GannWheel(_DEFAULT_CONFIG)
         self.assertIsInstance(gann, GannWheel)
         
         # 测试自定义配置初始化
@@ -91,7 +160,7 @@ class TestGannWheel(unittest.TestCase):
         
     def test_analyze_basic(self):
         """测试基本分析功能"""
-        result = self.gann.analyze(self.test_data)
+        result = self._get_analysis()
         
         # 检查返回结果结构
         self.assertIsInstance(result, dict)
@@ -167,15 +236,17 @@ class TestGannWheel(unittest.TestCase):
         # 检查价格水平的合理性
         current_price = self.test_data['close'].iloc[-1]
         
-        for level in support_levels:
-            self.assertLessEqual(level['price'], current_price)
+        support_prices = np.fromiter((level['price'] for level in support_levels), dtype=np.float64)
+        self.assertTrue((support_prices <= current_price).all(),
+                        f"支撑位高于当前价格: {support_prices[support_prices > current_price]}")
             
-        for level in resistance_levels:
-            self.assertGreaterEqual(level['price'], current_price)
+        resistance_prices = np.fromiter((level['price'] for level in resistance_levels), dtype=np.float64)
+        self.assertTrue((resistance_prices >= current_price).all(),
+                        f"阻力位低于当前价格: {resistance_prices[resistance_prices < current_price]}")
             
     def test_gann_square_calculation(self):
         """测试江恩正方形计算"""
-        result = self.gann.analyze(self.test_data)
+        result = self._get_analysis()
         gann_square = result['gann_square']
         
         self.assertIsInstance(gann_square, dict)
@@ -186,7 +257,7 @@ class TestGannWheel(unittest.TestCase):
         
     def test_resonance_analysis(self):
         """测试时间价格共振分析"""
-        result = self.gann.analyze(self.test_data)
+        result = self._get_analysis()
         resonance = result['resonance_analysis']
         
         self.assertIsInstance(resonance, dict)
@@ -196,7 +267,7 @@ class TestGannWheel(unittest.TestCase):
         
     def test_prediction_analysis(self):
         """测试预测分析"""
-        result = self.gann.analyze(self.test_data)
+        result = self._get_analysis()
         prediction = result['prediction']
         
         self.assertIsInstance(prediction, dict)
@@ -260,93 +331,74 @@ class TestGannWheel(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.gann.analyze(incomplete_data)
             
+    @pytest.mark.slow
     def test_performance_with_large_dataset(self):
         """测试大数据集性能"""
         # 创建更大的数据集（5年数据）
-        large_dates = pd.date_range(start='2019-01-01', end='2023-12-31', freq='D')
-        np.random.seed(42)
-        
-        large_prices = [10.0]
-        for _ in range(len(large_dates) - 1):
-            change = np.random.normal(0, 0.01)
-            new_price = large_prices[-1] * (1 + change)
-            large_prices.append(max(new_price, 0.1))
-            
-        large_data = pd.DataFrame({
-            'date': large_dates,
-            'open': large_prices,
-            'high': [p * 1.02 for p in large_prices],
-            'low': [p * 0.98 for p in large_prices],
-            'close': large_prices,
-            'volume': np.random.lognormal(10, 0.5, len(large_dates))
-        })
+        large_data = self._get_large_data()
         
         # 测试分析时间（应该在合理时间内完成）
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
         result = self.gann.analyze(large_data)
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         self.assertIsInstance(result, dict)
         self.assertLess(end_time - start_time, 30)  # 应该在30秒内完成
         
     def test_result_consistency(self):
         """测试结果一致性"""
-        # 多次运行相同数据应该得到相同结果
-        result1 = self.gann.analyze(self.test_data)
-        result2 = self.gann.analyze(self.test_data)
+        # 多次运行相同数据应该得到相同结果（使用新的小数据集，避开缓存结果）
+        small_data = self.test_data.head(120).copy()
+        result1 = self.gann.analyze(small_data)
+        result2 = self.gann.analyze(small_data)
         
-        # 比较关键数值结果
-        self.assertEqual(len(result1['time_cycles']), len(result2['time_cycles']))
-        self.assertEqual(len(result1['price_cycles']), len(result2['price_cycles']))
+        # 比较关键分析结果
+        self.assertEqual(result1['time_cycles'], result2['time_cycles'])
+        self.assertEqual(result1['price_cycles'], result2['price_cycles'])
         
 
 class TestGannWheelIntegration(unittest.TestCase):
     """江恩轮中轮集成测试类"""
     
-    def setUp(self):
-        """集成测试准备"""
+    @classmethod
+    def setUpClass(cls):
+        """集成测试准备（测试数据只读，整个类共享一份）"""
         # 创建测试配置
-        self.test_config = {
-            'time_cycles': [7, 14, 21, 30, 45, 60, 90, 120, 180, 360],
-            'price_angles': [15, 30, 45, 60, 75, 90, 105, 120, 135, 150, 165, 180],
-            'square_size': 144,
-            'tolerance': 0.02
-        }
+        cls.test_config = _DEFAULT_CONFIG
         
-        self.gann = GannWheel(self.test_config)
+        cls.gann = GannWheel(cls.test_config)
         
         # 创建更真实的股价数据（模拟趋势）
         dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='D')
+        cls.rng = np.random.default_rng(42)
         
         # 模拟上升趋势 + 随机波动
         base_price = 10.0
         trend = 0.0002  # 每日0.02%的上升趋势
         
-        prices = []
-        for i, date in enumerate(dates):
-            trend_price = base_price * (1 + trend) ** i
-            noise = np.random.normal(0, 0.015)  # 1.5%的随机波动
-            daily_price = trend_price * (1 + noise)
-            prices.append(max(daily_price, 0.1))
+        n = len(dates)
+        trend_prices = base_price * (1 + trend) ** np.arange(n)
+        noise = cls.rng.normal(0, 0.015, n)  # 1.5%的随机波动
+        prices_arr = np.maximum(trend_prices * (1 + noise), 0.1)
+        
+        noise_h = np.abs(cls.rng.normal(0, 0.008, n))
+        noise_l = np.abs(cls.rng.normal(0, 0.008, n))
             
-        self.realistic_data = pd.DataFrame({
+        cls.realistic_data = pd.DataFrame({
             'date': dates,
-            'open': prices,
-            'high': [p * (1 + abs(np.random.normal(0, 0.008))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.008))) for p in prices],
-            'close': prices,
-            'volume': np.random.lognormal(12, 0.3, len(dates))
+            'open': prices_arr,
+            'high': prices_arr * (1 + noise_h),
+            'low': prices_arr * (1 - noise_l),
+            'close': prices_arr,
+            'volume': cls.rng.lognormal(12, 0.3, n)
         })
         
         # 确保OHLC数据的逻辑关系
-        for i in range(len(self.realistic_data)):
-            high = max(self.realistic_data.loc[i, ['open', 'close']].max(), 
-                      self.realistic_data.loc[i, 'high'])
-            low = min(self.realistic_data.loc[i, ['open', 'close']].min(), 
-                     self.realistic_data.loc[i, 'low'])
-            self.realistic_data.loc[i, 'high'] = high
-            self.realistic_data.loc[i, 'low'] = low
+        df = cls.realistic_data
+        o = df['open'].values
+        c = df['close'].values
+        df['high'] = np.maximum.reduce([df['high'].values, o, c])
+        df['low'] = np.minimum.reduce([df['low'].values, o, c])
             
     def test_full_analysis_workflow(self):
         """测试完整分析工作流程"""
@@ -393,26 +445,35 @@ class TestGannWheelIntegration(unittest.TestCase):
         
         # 支撑位应该在当前价格下方
         support_levels = sr_levels.get('support', [])
-        for support in support_levels:
-            if isinstance(support, dict) and 'price' in support:
-                self.assertLessEqual(support['price'], current_price * 1.01)  # 允许小误差
+        support_prices = np.fromiter(
+            (level['price'] for level in support_levels if isinstance(level, dict) and 'price' in level),
+            dtype=np.float64
+        )
+        support_limit = current_price * 1.01  # 允许小误差
+        self.assertTrue((support_prices <= support_limit).all(),
+                        f"支撑位高于当前价格: {support_prices[support_prices > support_limit]}")
                 
         # 阻力位应该在当前价格上方
         resistance_levels = sr_levels.get('resistance', [])
-        for resistance in resistance_levels:
-            if isinstance(resistance, dict) and 'price' in resistance:
-                self.assertGreaterEqual(resistance['price'], current_price * 0.99)  # 允许小误差
+        resistance_prices = np.fromiter(
+            (level['price'] for level in resistance_levels if isinstance(level, dict) and 'price' in level),
+            dtype=np.float64
+        )
+        resistance_limit = current_price * 0.99  # 允许小误差
+        self.assertTrue((resistance_prices >= resistance_limit).all(),
+                        f"阻力位低于当前价格: {resistance_prices[resistance_prices < resistance_limit]}")
                 
 
 if __name__ == '__main__':
     # 创建测试套件
     test_suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
     
     # 添加单元测试
-    test_suite.addTest(unittest.makeSuite(TestGannWheel))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestGannWheel))
     
     # 添加集成测试
-    test_suite.addTest(unittest.makeSuite(TestGannWheelIntegration))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestGannWheelIntegration))
     
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)
@@ -13,19 +13,23 @@
 
 import pytest
 import asyncio
-from unittest.mock import Mock, patch, AsyncMock
+from contextlib import ExitStack
+from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
 
 from src.data.realtime_fetcher import RealtimeFetcher
 from src.utils.config_manager import ConfigManager
 
+# Mock数据使用的固定时间戳（用例不校验具体时间，固定值使输出可复现）
+_FIXED_TS = "2024-01-15 09:30:00"
+
 
 class TestRealtimeFetcher:
     """实时数据获取器测试类"""
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def config_manager(self):
-        """创建配置管理器实例"""
+        """创建配置管理器实例（只读Mock，整个会话共享）"""
         config = {
             'realtime_data': {
                 'enabled': True,
@@ -49,7 +53,7 @@ class TestRealtimeFetcher:
     
     @pytest.fixture
     def realtime_fetcher(self, config_manager):
-        """创建实时数据获取器实例"""
+        """创建实时数据获取器实例（各用例会修改缓存，每次重新创建）"""
         return RealtimeFetcher(config_manager)
     
     def test_init(self, realtime_fetcher):
@@ -61,7 +65,7 @@ class TestRealtimeFetcher:
         assert realtime_fetcher.monitoring_task is None
     
     @pytest.mark.asyncio
-    async def test_get_realtime_price_akshare(self, realtime_fetcher):
+    async def test_get_realtime_price_akshare(self, realtime_fetcher, async_mock_factory):
         """测试通过AKShare获取实时价格"""
         # Mock AKShare数据
         mock_data = {
@@ -76,11 +80,11 @@ class TestRealtimeFetcher:
             'low': 12.30,
             'open': 12.35,
             'pre_close': 12.35,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'timestamp': _FIXED_TS
         }
         
         with patch.object(realtime_fetcher, '_fetch_akshare_realtime', 
-                         new_callable=AsyncMock, return_value=mock_data):
+                         new=async_mock_factory(return_value=mock_data)):
             result = await realtime_fetcher.get_realtime_price('000001')
             
             assert result is not None
@@ -89,30 +93,30 @@ class TestRealtimeFetcher:
             assert 'timestamp' in result
     
     @pytest.mark.asyncio
-    async def test_get_realtime_price_cache(self, realtime_fetcher):
+    async def test_get_realtime_price_cache(self, realtime_fetcher, async_mock_factory):
         """测试实时价格缓存机制"""
         symbol = '000001'
         mock_data = {
             'symbol': symbol,
             'price': 12.50,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'timestamp': _FIXED_TS
         }
         
         # 第一次调用，应该从数据源获取
         with patch.object(realtime_fetcher, '_fetch_akshare_realtime',
-                         new_callable=AsyncMock, return_value=mock_data) as mock_fetch:
+                         new=async_mock_factory(return_value=mock_data)) as mock_fetch:
             result1 = await realtime_fetcher.get_realtime_price(symbol)
             assert mock_fetch.call_count == 1
         
         # 第二次调用，应该从缓存获取
         with patch.object(realtime_fetcher, '_fetch_akshare_realtime',
-                         new_callable=AsyncMock, return_value=mock_data) as mock_fetch:
+                         new=async_mock_factory(return_value=mock_data)) as mock_fetch:
             result2 = await realtime_fetcher.get_realtime_price(symbol)
             assert mock_fetch.call_count == 0  # 不应该调用数据源
             assert result2['symbol'] == symbol
     
     @pytest.mark.asyncio
-    async def test_get_tick_data(self, realtime_fetcher):
+    async def test_get_tick_data(self, realtime_fetcher, async_mock_factory):
         """测试获取分时数据"""
         mock_data = {
             'symbol': '000001',
@@ -121,11 +125,11 @@ class TestRealtimeFetcher:
                 {'time': '09:31', 'price': 12.40, 'volume': 150000},
                 {'time': '09:32', 'price': 12.45, 'volume': 120000}
             ],
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'timestamp': _FIXED_TS
         }
         
         with patch.object(realtime_fetcher, '_fetch_akshare_tick',
-                         new_callable=AsyncMock, return_value=mock_data):
+                         new=async_mock_factory(return_value=mock_data)):
             result = await realtime_fetcher.get_tick_data('000001')
             
             assert result is not None
@@ -134,7 +138,7 @@ class TestRealtimeFetcher:
             assert result['data'][0]['time'] == '09:30'
     
     @pytest.mark.asyncio
-    async def test_get_market_depth(self, realtime_fetcher):
+    async def test_get_market_depth(self, realtime_fetcher, async_mock_factory):
         """测试获取盘口数据"""
         mock_data = {
             'symbol': '000001',
@@ -148,11 +152,11 @@ class TestRealtimeFetcher:
                 {'price': 12.51, 'volume': 1200},
                 {'price': 12.52, 'volume': 900}
             ],
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'timestamp': _FIXED_TS
         }
         
         with patch.object(realtime_fetcher, '_fetch_akshare_depth',
-                         new_callable=AsyncMock, return_value=mock_data):
+                         new=async_mock_factory(return_value=mock_data)):
             result = await realtime_fetcher.get_market_depth('000001')
             
             assert result is not None
@@ -208,33 +212,32 @@ class TestRealtimeFetcher:
         assert not realtime_fetcher._is_cache_valid(symbol)
     
     @pytest.mark.asyncio
-    async def test_fallback_mechanism(self, realtime_fetcher):
+    async def test_fallback_mechanism(self, realtime_fetcher, async_mock_factory):
         """测试数据源回退机制"""
         symbol = '000001'
         
         # Mock AKShare失败，Sina成功
-        with patch.object(realtime_fetcher, '_fetch_akshare_realtime',
-                         new_callable=AsyncMock, side_effect=Exception("AKShare failed")):
-            with patch.object(realtime_fetcher, '_fetch_sina_realtime',
-                             new_callable=AsyncMock, return_value={'symbol': symbol, 'price': 12.50}):
-                result = await realtime_fetcher.get_realtime_price(symbol)
-                assert result is not None
-                assert result['symbol'] == symbol
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(realtime_fetcher, '_fetch_akshare_realtime',
+                                             new=async_mock_factory(side_effect=Exception("AKShare failed"))))
+            stack.enter_context(patch.object(realtime_fetcher, '_fetch_sina_realtime',
+                                             new=async_mock_factory(return_value={'symbol': symbol, 'price': 12.50})))
+            result = await realtime_fetcher.get_realtime_price(symbol)
+            assert result is not None
+            assert result['symbol'] == symbol
     
     @pytest.mark.asyncio
-    async def test_error_handling(self, realtime_fetcher):
+    async def test_error_handling(self, realtime_fetcher, async_mock_factory):
         """测试错误处理"""
         symbol = '000001'
         
         # 所有数据源都失败
-        with patch.object(realtime_fetcher, '_fetch_akshare_realtime',
-                         new_callable=AsyncMock, side_effect=Exception("Failed")):
-            with patch.object(realtime_fetcher, '_fetch_sina_realtime',
-                             new_callable=AsyncMock, side_effect=Exception("Failed")):
-                with patch.object(realtime_fetcher, '_fetch_eastmoney_realtime',
-                                 new_callable=AsyncMock, side_effect=Exception("Failed")):
-                    with pytest.raises(Exception):
-                        await realtime_fetcher.get_realtime_price(symbol)
+        with ExitStack() as stack:
+            for name in ('_fetch_akshare_realtime', '_fetch_sina_realtime', '_fetch_eastmoney_realtime'):
+                stack.enter_context(patch.object(realtime_fetcher, name,
+                                                 new=async_mock_factory(side_effect=Exception("Failed"))))
+            with pytest.raises(Exception):
+                await realtime_fetcher.get_realtime_price(symbol)
 
 
 if __name__ == '__main__':
@@ -10,71 +10,28 @@
 日期: 2024-01-15
 """
 
+import threading
+import time
 import unittest
+import pytest
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import sys
-import os
-
-# 添加项目根目录到路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# 项目根目录由 pytest.ini 的 pythonpath 加入导入路径
 from src.analysis.volume_price.volume_price_analyzer import VolumePriceAnalyzer
 
 
 class TestVolumePriceAnalyzer(unittest.TestCase):
     """量价分析器测试类"""
     
-    def setUp(self):
-        """测试前准备工作"""
-        # 创建测试配置
-        self.test_config = {
-            'volume_ma_periods': [5, 10, 20, 60],
-            'price_ma_periods': [5, 10, 20, 60],
-            'divergence_threshold': 0.15,
-            'volume_spike_threshold': 2.0,
-            'correlation_window': 20
-        }
-        
-        self.analyzer = VolumePriceAnalyzer(self.test_config)
-        
-        # 创建测试数据
-        dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='D')
-        np.random.seed(42)  # 确保测试结果可重复
-        
-        # 生成模拟股价数据
-        base_price = 10.0
-        price_changes = np.random.normal(0, 0.02, len(dates))
-        prices = [base_price]
-        
-        for change in price_changes[1:]:
-            new_price = prices[-1] * (1 + change)
-            prices.append(max(new_price, 0.1))  # 确保价格为正
-        
-        # 生成成交量数据（与价格有一定相关性）
-        base_volume = 1000000
-        volume_changes = np.random.normal(0, 0.3, len(dates))
-        volumes = []
-        
-        for i, (price_change, vol_change) in enumerate(zip(price_changes, volume_changes)):
-            # 价格变化大时，成交量通常也会增加
-            volume_factor = 1 + abs(price_change) * 2 + vol_change
-            volume = base_volume * max(volume_factor, 0.1)
-            volumes.append(volume)
-        
-        self.test_data = pd.DataFrame({
-            'Date': dates,
-            'Open': prices,
-            'High': [p * (1 + abs(np.random.normal(0, 0.01))) for p in prices],
-            'Low': [p * (1 - abs(np.random.normal(0, 0.01))) for p in prices],
-            'Close': prices,
-            'Volume': volumes
-        })
-        
-        # 确保high >= close >= low
-        self.test_data['High'] = self.test_data[['High', 'Close']].max(axis=1)
-        self.test_data['Low'] = self.test_data[['Low', 'Close']].min(axis=1)
+    @pytest.fixture(autouse=True, scope="class")
+    def _inject(self, request, vp_analyzer, base_ohlcv, large_ohlcv):
+        """注入会话级共享的分析器和测试数据（只读），并对test_data分析一次供只读用例共享"""
+        request.cls.analyzer = vp_analyzer
+        request.cls.test_data = base_ohlcv
+        request.cls.large_data = large_ohlcv
+        request.cls._analysis = vp_analyzer.analyze_stock('TEST', base_ohlcv)
         
     def test_initialization(self):
         """测试量价分析器初始化"""
@@ -102,7 +59,7 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
         
     def test_analyze_basic(self):
         """测试基本分析功能"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         
         # 检查返回结果结构
         self.assertIsInstance(result, dict)
@@ -123,7 +80,7 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
             
     def test_analyze_volume_price_relation(self):
         """测试量价关系分析"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         
         # 检查量价关系分析结果
         self.assertIn('volume_price_relation', result)
@@ -140,7 +97,7 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
         
     def test_detect_divergence(self):
         """测试量价背离检测"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         
         # 检查背离分析结果
         self.assertIn('divergence_analysis', result)
@@ -156,31 +113,27 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
         
     def test_calculate_volume_indicators(self):
         """测试成交量指标计算"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         
         # 检查基础指标
         self.assertIn('basic_indicators', result)
         indicators = result['basic_indicators']
         
         self.assertIsInstance(indicators, dict)
-        # 检查基础指标的基本结构
-        self.assertIsInstance(indicators, dict)
         
     def test_identify_abnormal_volume(self):
         """测试异常成交量识别"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         
         # 检查成交量模式分析
         self.assertIn('volume_patterns', result)
         abnormal = result['volume_patterns']
         
         self.assertIsInstance(abnormal, dict)
-        # 检查成交量模式的基本结构
-        self.assertIsInstance(abnormal, dict)
             
     def test_generate_trading_signals(self):
         """测试交易信号生成"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         
         # 检查交易信号
         self.assertIn('trading_signals', result)
@@ -201,30 +154,24 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
             
     def test_coordination_analysis(self):
         """测试价量配合度分析"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         coordination = result['price_volume_coordination']
         
         self.assertIsInstance(coordination, dict)
-        # 检查价量配合度的基本结构
-        self.assertIsInstance(coordination, dict)
         
     def test_trend_analysis(self):
         """测试趋势分析"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         trend = result['trend_analysis']
         
         self.assertIsInstance(trend, dict)
-        # 检查趋势分析的基本结构
-        self.assertIsInstance(trend, dict)
         
     def test_comprehensive_rating(self):
         """测试综合评级"""
-        result = self.analyzer.analyze_stock('TEST', self.test_data)
+        result = self._analysis
         rating = result['comprehensive_score']
         
         self.assertIsInstance(rating, dict)
-        # 检查综合评分的基本结构
-        self.assertIsInstance(rating, dict)
         
     def test_empty_data_handling(self):
         """测试空数据处理"""
@@ -247,7 +194,7 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
         """测试无效数据处理"""
         # 创建包含NaN的数据
         invalid_data = self.test_data.copy()
-        invalid_data.loc[10:20, 'Volume'] = np.nan
+        invalid_data.iloc[10:21, invalid_data.columns.get_loc('Volume')] = np.nan
         
         result = self.analyzer.analyze_stock('TEST', invalid_data)
         
@@ -258,7 +205,7 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
         """测试零成交量处理"""
         # 创建包含零成交量的数据
         zero_volume_data = self.test_data.copy()
-        zero_volume_data.loc[10:15, 'Volume'] = 0
+        zero_volume_data.iloc[10:16, zero_volume_data.columns.get_loc('Volume')] = 0
         
         result = self.analyzer.analyze_stock('TEST', zero_volume_data)
         
@@ -289,7 +236,7 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
     def test_data_validation(self):
         """测试数据验证"""
         # 测试缺少必要列的数据
-        incomplete_data = self.test_data[['Date', 'Close']].copy()
+        incomplete_data = self.test_data[['Close']].copy()
         
         # 应该能处理缺少列的情况并返回结果或抛出异常
         try:
@@ -299,48 +246,75 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
             # 如果抛出异常也是可以接受的
             pass
             
+    @pytest.mark.slow
     def test_performance_with_large_dataset(self):
         """测试大数据集性能"""
-        # 创建更大的数据集（5年数据）
-        large_dates = pd.date_range(start='2019-01-01', end='2023-12-31', freq='D')
-        np.random.seed(42)
-        
-        large_prices = [10.0]
-        large_volumes = [1000000]
-        
-        for i in range(len(large_dates) - 1):
-            price_change = np.random.normal(0, 0.01)
-            volume_change = np.random.normal(0, 0.2)
-            
-            new_price = large_prices[-1] * (1 + price_change)
-            new_volume = large_volumes[-1] * (1 + volume_change + abs(price_change))
-            
-            large_prices.append(max(new_price, 0.1))
-            large_volumes.append(max(new_volume, 1000))
-            
-        large_data = pd.DataFrame({
-            'Date': large_dates,
-            'Open': large_prices,
-            'High': [p * 1.02 for p in large_prices],
-            'Low': [p * 0.98 for p in large_prices],
-            'Close': large_prices,
-            'Volume': large_volumes
-        })
-        
-        # 测试分析时间（应该在合理时间内完成）
-        import time
-        start_time = time.time()
-        result = self.analyzer.analyze_stock('TEST', large_data)
-        end_time = time.time()
+        # 5年数据由会话级fixture生成，这里只计量分析本身，应该在合理时间内完成
+        start_time = time.perf_counter()
+        result = self.analyzer.analyze_stock('TEST', self.large_data)
+        end_time = time.perf_counter()
         
         self.assertIsInstance(result, dict)
         self.assertLess(end_time - start_time, 30)  # 应该在30秒内完成
         
+    def test_result_cache(self):
+        """测试分析结果缓存"""
+        analyzer = VolumePriceAnalyzer({'cache_size': 2})
+        data = self.test_data.head(120)
+        
+        # 相同数据重复分析复用缓存结果，但返回刷新了分析时间的新字典
+        result = analyzer.analyze_stock('TEST', data)
+        result['trading_signals'] = 'modified'
+        cached = analyzer.analyze_stock('TEST', data.copy())
+        self.assertIsNot(cached, result)
+        self.assertIs(cached['basic_indicators'], result['basic_indicators'])
+        self.assertIsInstance(cached['trading_signals'], dict)  # 调用方替换顶层键不影响缓存
+        self.assertGreaterEqual(cached['analysis_date'], result['analysis_date'])
+        
+        # 数据内容或股票代码不同时重新分析
+        modified_data = data.copy()
+        modified_data.iloc[-1, modified_data.columns.get_loc('Volume')] *= 2
+        self.assertIsNot(analyzer.analyze_stock('TEST', modified_data)['basic_indicators'], result['basic_indicators'])
+        self.assertIsNot(analyzer.analyze_stock('OTHER', data)['basic_indicators'], result['basic_indicators'])
+        
+        # 超出容量时淘汰最早的结果，清空后重新分析
+        self.assertLessEqual(len(analyzer._result_cache), 2)
+        analyzer.clear_cache()
+        self.assertIsNot(analyzer.analyze_stock('OTHER', data)['basic_indicators'], result['basic_indicators'])
+
+    def test_intermediate_cache(self):
+        """测试滚动统计中间结果缓存（单次分析内复用，分析结束即释放）"""
+        analyzer = VolumePriceAnalyzer({'cache_size': 0})
+        data = self.test_data.head(120)
+        
+        # 分析期间同一份数据的滚动统计只计算一次，其他数据不走缓存
+        analyzer._begin_intermediate_cache(data)
+        volume_ma = analyzer._rolling_stat(data, 'Volume', 20)
+        self.assertIs(analyzer._rolling_stat(data, 'Volume', 20), volume_ma)
+        self.assertIsNot(analyzer._rolling_stat(data.copy(), 'Volume', 20), volume_ma)
+        
+        # 缓存按线程隔离
+        other_thread_ma = []
+        thread = threading.Thread(target=lambda: other_thread_ma.append(analyzer._rolling_stat(data, 'Volume', 20)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other_thread_ma[0], volume_ma)
+        pd.testing.assert_series_equal(other_thread_ma[0], volume_ma)
+        analyzer._end_intermediate_cache()
+        
+        # 分析结束后不保留数据引用，结果与直接计算一致
+        result = analyzer.analyze_stock('TEST', data)
+        self.assertIsNone(analyzer._call_state.data)
+        pd.testing.assert_series_equal(
+            result['basic_indicators']['volume_ma']['ma_20'], data['Volume'].rolling(20).mean()
+        )
+        
     def test_result_consistency(self):
         """测试结果一致性"""
-        # 多次运行相同数据应该得到相同结果
-        result1 = self.analyzer.analyze_stock('TEST', self.test_data)
-        result2 = self.analyzer.analyze_stock('TEST', self.test_data)
+        # 用新的分析器（无缓存）重新分析，结果应该与之前一致；共享分析器的缓存不清空
+        result1 = self._analysis
+        result2 = VolumePriceAnalyzer(self.analyzer.config).analyze_stock('TEST', self.test_data)
+        self.assertIsNot(result1['basic_indicators'], result2['basic_indicators'])
         
         # 比较关键数值结果
         self.assertEqual(
@@ -357,94 +331,11 @@ class TestVolumePriceAnalyzer(unittest.TestCase):
 class TestVolumePriceAnalyzerIntegration(unittest.TestCase):
     """量价分析器集成测试类"""
     
-    def setUp(self):
-        """集成测试准备"""
-        # 创建测试配置
-        self.test_config = {
-            'volume_ma_periods': [5, 10, 20, 60],
-            'price_ma_periods': [5, 10, 20, 60],
-            'divergence_threshold': 0.15,
-            'volume_spike_threshold': 2.0,
-            'correlation_window': 20
-        }
-        
-        self.analyzer = VolumePriceAnalyzer(self.test_config)
-        
-        # 创建更真实的量价数据
-        dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='D')
-        np.random.seed(42)
-        
-        # 模拟不同的市场阶段
-        base_price = 10.0
-        base_volume = 1000000
-        
-        prices = [base_price]
-        volumes = [base_volume]
-        
-        # 创建三个阶段：上升、盘整、下降
-        stage1_len = len(dates) // 3  # 上升阶段
-        stage2_len = len(dates) // 3  # 盘整阶段
-        stage3_len = len(dates) - stage1_len - stage2_len  # 下降阶段
-        
-        # 上升阶段：价涨量增
-        for i in range(stage1_len):
-            price_change = np.random.normal(0.001, 0.015)  # 轻微上升趋势
-            volume_change = np.random.normal(0.002, 0.2)  # 成交量增加
-            
-            new_price = prices[-1] * (1 + price_change)
-            new_volume = volumes[-1] * (1 + volume_change)
-            
-            prices.append(max(new_price, 0.1))
-            volumes.append(max(new_volume, 1000))
-            
-        # 盘整阶段：价平量缩
-        for i in range(stage2_len):
-            price_change = np.random.normal(0, 0.01)  # 无明显趋势
-            volume_change = np.random.normal(-0.001, 0.15)  # 成交量减少
-            
-            new_price = prices[-1] * (1 + price_change)
-            new_volume = volumes[-1] * (1 + volume_change)
-            
-            prices.append(max(new_price, 0.1))
-            volumes.append(max(new_volume, 1000))
-            
-        # 下降阶段：价跌量增（恐慌性抛售）
-        for i in range(stage3_len):
-            price_change = np.random.normal(-0.002, 0.02)  # 下降趋势
-            volume_change = np.random.normal(0.003, 0.25)  # 成交量放大
-            
-            new_price = prices[-1] * (1 + price_change)
-            new_volume = volumes[-1] * (1 + volume_change)
-            
-            prices.append(max(new_price, 0.1))
-            volumes.append(max(new_volume, 1000))
-        
-        # 确保数据长度匹配
-        while len(prices) < len(dates):
-            prices.append(prices[-1])
-            volumes.append(volumes[-1])
-        
-        # 截断多余的数据
-        prices = prices[:len(dates)]
-        volumes = volumes[:len(dates)]
-            
-        self.realistic_data = pd.DataFrame({
-            'Date': dates,
-            'Open': prices,
-            'High': [p * (1 + abs(np.random.normal(0, 0.008))) for p in prices],
-            'Low': [p * (1 - abs(np.random.normal(0, 0.008))) for p in prices],
-            'Close': prices,
-            'Volume': volumes
-        })
-        
-        # 确保OHLC数据的逻辑关系
-        for i in range(len(self.realistic_data)):
-            high = max(self.realistic_data.loc[i, ['Open', 'Close']].max(), 
-                      self.realistic_data.loc[i, 'High'])
-            low = min(self.realistic_data.loc[i, ['Open', 'Close']].min(), 
-                     self.realistic_data.loc[i, 'Low'])
-            self.realistic_data.loc[i, 'High'] = high
-            self.realistic_data.loc[i, 'Low'] = low
+    @pytest.fixture(autouse=True, scope="class")
+    def _inject(self, request, vp_analyzer, realistic_ohlcv):
+        """注入会话级共享的分析器和分阶段行情数据（只读）"""
+        request.cls.analyzer = vp_analyzer
+        request.cls.realistic_data = realistic_ohlcv
             
     def test_full_analysis_workflow(self):
         """测试完整分析工作流程"""
@@ -541,10 +432,9 @@ class TestVolumePriceAnalyzerIntegration(unittest.TestCase):
         test_data = self.realistic_data.copy()
         
         # 添加成交量异常放大的日期
-        spike_indices = [50, 150, 250]
-        for idx in spike_indices:
-            if idx < len(test_data):
-                test_data.loc[idx, 'Volume'] *= 5  # 成交量放大5倍
+        spike_indices = [idx for idx in (50, 150, 250) if idx < len(test_data)]
+        volume_col = test_data.columns.get_loc('Volume')
+        test_data.iloc[spike_indices, volume_col] *= 5  # 成交量放大5倍
                 
         result = self.analyzer.analyze_stock('TEST', test_data)
         abnormal = result['abnormal_volume']
@@ -568,23 +458,5 @@ class TestVolumePriceAnalyzerIntegration(unittest.TestCase):
                 self.assertTrue(len(abnormal) >= 0)
         
 
-if __name__ == '__main__':
-    # 创建测试套件
-    test_suite = unittest.TestSuite()
-    
-    # 添加单元测试
-    test_suite.addTest(unittest.makeSuite(TestVolumePriceAnalyzer))
-    
-    # 添加集成测试
-    test_suite.addTest(unittest.makeSuite(TestVolumePriceAnalyzerIntegration))
-    
-    # 运行测试
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(test_suite)
-    
-    # 输出测试结果摘要
-    print(f"\n测试摘要:")
-    print(f"运行测试: {result.testsRun}")
-    print(f"失败: {len(result.failures)}")
-    print(f"错误: {len(result.errors)}")
-    print(f"成功率: {((result.testsRun - len(result.failures) - len(result.errors)) / result.testsRun * 100):.1f}%")
\ No newline at end of file
+# 运行方式：python -m pytest tests/test_volume_price_analyzer.py
+# （导入路径由 pytest.ini 配置，pytest-xdist多进程并行执行）